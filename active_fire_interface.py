@@ -131,7 +131,7 @@ def get_file_info(filename, afire_options, read_file=False):
 
     # Get a table of the leap seconds
     iet_epoch = datetime(1958, 1, 1)
-    leapsec_dt_list = get_leapsec_table(afire_options['ancil_dir'])
+    leapsec_dt_list = get_leapsec_table(afire_options.ancil_dir)
 
     # Compile the regular expression for the filename...
     re_pattern = re.compile(pattern)
@@ -265,7 +265,7 @@ def inventory_dirs(input_dirs, afire_options):
     if input_dirs == []:
         LOG.debug('\t\tNo input directories')
 
-    input_prefixes = afire_options['input_prefixes']
+    input_prefixes = afire_options.input_prefixes
 
     for dirs in input_dirs:
         LOG.debug("\tchecking directory for files: {}".format(dirs))
@@ -314,9 +314,9 @@ def generate_file_dict(inputs, afire_options, full=False):
     m_band_prefixes = ['GMTCO', 'SVM05', 'SVM07', 'SVM11', 'SVM13', 'SVM15', 'SVM16']
     i_band_prefixes = ['GMTCO', 'GITCO', 'SVI01', 'SVI02', 'SVI03', 'SVI04', 'SVI05', 'SVM13', 'IVCDB']
 
-    input_prefixes = i_band_prefixes if afire_options['i_band'] else m_band_prefixes
+    input_prefixes = i_band_prefixes if afire_options.i_band else m_band_prefixes
 
-    afire_options['input_prefixes'] = input_prefixes
+    afire_options.input_prefixes = input_prefixes
 
     input_dirs = []
     input_files = []
@@ -447,7 +447,7 @@ def generate_file_dict(inputs, afire_options, full=False):
         # De-aggregate the aggregated files, and return the directory where the de-aggregated
         # files are...
         LOG.debug('\tDe-aggregating aggregated files...')
-        afire_home = afire_options['afire_home']
+        afire_home = afire_options.afire_home
         unagg_inputs_dir = unaggregate_inputs(afire_home, agg_input_files, afire_options)
 
         # Create a list of dicts containing valid inputs, from the de-aggregated files
@@ -486,7 +486,7 @@ def get_afire_inputs(inputs, afire_options):
     granule ID.
     '''
 
-    afire_home = afire_options['afire_home']
+    afire_home = afire_options.afire_home
 
     # Create a list of dicts containing valid inputs, which may include aggregated files
     LOG.debug('Creating master list of files...')
@@ -499,7 +499,7 @@ def get_afire_inputs(inputs, afire_options):
     for granule_id in granule_id_list:
         LOG.debug('Checking granule_id {}...'.format(granule_id))
         missing_prefixes = []
-        for prefix in sorted(afire_options['input_prefixes']):
+        for prefix in sorted(afire_options.input_prefixes):
             LOG.debug('\tChecking prefix {}...'.format(prefix))
             try:
                 LOG.debug('\t\tafire_data_dict["{}"]["{}"] = {}'.format(
@@ -538,12 +538,12 @@ def construct_cmd_invocations(afire_data_dict, afire_options):
 
     granule_id_list = sorted(afire_data_dict.keys())
 
-    geo_prefix = 'GITCO' if afire_options['i_band'] else 'GMTCO'
+    geo_prefix = 'GITCO' if afire_options.i_band else 'GMTCO'
     lwm_prefix = 'GRLWM'
-    af_prefix = 'AFIMG' if afire_options['i_band'] else 'AFMOD'
-    vfire_exe = 'vfire375_static' if afire_options['i_band'] else 'vfire750_static'
+    af_prefix = 'AFIMG' if afire_options.i_band else 'AFMOD'
+    vfire_exe = 'vfire375_static' if afire_options.i_band else 'vfire750_static'
 
-    afire_options['vfire_exe'] = vfire_exe
+    afire_options.vfire_exe = vfire_exe
 
     for granule_id in granule_id_list:
 
@@ -580,7 +580,7 @@ def construct_cmd_invocations(afire_data_dict, afire_options):
             afire_data_dict[granule_id][geo_prefix]['orbit'],
             creation_dt.strftime("%Y%m%d%H%M%S%f"),
             'nc'
-            #'h5' if afire_options['i_band'] else 'nc' # FIXME: NOAA should fix NC output for I-band!
+            #'h5' if afire_options.i_band else 'nc' # FIXME: NOAA should fix NC output for I-band!
         )
         afire_output_txt_file = '{}.txt'.format(splitext(afire_output_file)[0])
 
@@ -591,7 +591,7 @@ def construct_cmd_invocations(afire_data_dict, afire_options):
 
         # Construct the command line invocation. As the "vfire" binary is currently constructed,
         # The order of the inputs is important.
-        if afire_options['i_band']:
+        if afire_options.i_band:
             af_format_str = './{} -ndv' + ' {}' * 11
             afire_data_dict[granule_id]['cmd'] = af_format_str.format(
                 vfire_exe,
@@ -162,7 +162,7 @@ class LandWaterMask():
         DEM_dLat = 30. * (1. / 3600.)
         DEM_dLon = 30. * (1. / 3600.)
 
-        DEM_fileName = path.join(self.afire_options['ancil_dir'],
+        DEM_fileName = path.join(self.afire_options.ancil_dir,
                                  'dem30ARC_Global_LandWater_compressed.h5')
         self.sourceList.append(path.basename(DEM_fileName))
 
@@ -262,7 +262,7 @@ class LandWaterMask():
         data = np.ones(np.shape(dataLat), dtype=np.float64) * 254.
         dataIdx = np.ones(np.shape(dataLat), dtype=np.int64) * -254
 
-        libFile = path.join(self.afire_options['afire_home'],
+        libFile = path.join(self.afire_options.afire_home,
                             'lib', 'libgriddingAndGranulation.so')
         LOG.debug("Gridding and granulation library file: {}".format(libFile))
         lib = ctypes.cdll.LoadLibrary(libFile)
@@ -427,7 +427,7 @@ class LandWaterMask():
             setattr(file_obj, 'Image_Date', granule_dt.strftime("%Y%j"))
             setattr(file_obj, 'Image_Time', granule_dt.strftime("%H%M%S"))
             setattr(file_obj, 'Source', 'dem30ARC; CSPP Active Fires version: {}'.format(
-                afire_options['version']))
+                afire_options.version))
 
             # Close the file
             file_obj.close()
@@ -29,10 +29,10 @@ def nc_from_cdl(afire_options, granule_dict, lwm_file):
     Creates an empty output netCDF4 file from a CDL file.
     '''
     env_vars = {}
-    lwm_cdl_file = pjoin(afire_options['ancil_dir'],
+    lwm_cdl_file = pjoin(afire_options.ancil_dir,
                                      'AF-LAND_MASK_NASA_1KM.cdl')
 
-    ncgen_bin = pjoin(afire_options['afire_home'], 'vendor/ShellB3/bin', 'ncgen')
+    ncgen_bin = pjoin(afire_options.afire_home, 'vendor/ShellB3/bin', 'ncgen')
     cmd = '{} -b {} -o {}'.format(ncgen_bin,
                                   lwm_cdl_file,
                                   lwm_file)
@@ -63,10 +63,13 @@ def get_lwm(afire_options, granule_dict):
                    'shipout': shipout_rc}
 
         # Check that the required cache dir already exists...
-        #geo_prefix = 'GITCO' if afire_options['i_band'] else 'GMTCO' # FUTURE
+        #geo_prefix = 'GITCO' if afire_options.i_band else 'GMTCO' # FUTURE
         geo_prefix = 'GMTCO'
-        anc_dir = granule_dict[geo_prefix]['dt'].strftime('%Y_%m_%d_%j-%Hh')
-        lwm_dir = pjoin(afire_options['cache_dir'], anc_dir)
+        if 'anc_dir' in granule_dict.keys():
+            anc_dir = granule_dict['anc_dir']
+        else:
+            anc_dir = granule_dict[geo_prefix]['dt'].strftime('%Y_%m_%d_%j-%Hh')
+        lwm_dir = pjoin(afire_options.cache_dir, anc_dir)
         if not isdir(lwm_dir):
             LOG.error("LWM dir {} is not considered a valid directory, aborting.".format(lwm_dir))
             return 1, rc_dict, None
@@ -22,6 +22,35 @@ from utils import check_and_convert_path, create_dir
 
 LOG = logging.getLogger(__name__)
 
+# The default and maximum limits, in seconds, on the Active Fires execution time for a single
+# granule.
+DEFAULT_GRANULE_TIMEOUT = 1800
+MAX_GRANULE_TIMEOUT = 7 * 24 * 3600
+
+
+class AfireOptions(object):
+    '''
+    Container for the Active Fires options, which are shared by all of the processing stages, and
+    are passed to each of the worker processes. Options that haven't been set take their value
+    from _defaults, or are None.
+    '''
+
+    __slots__ = ('inputs', 'afire_home', 'i_band', 'work_dir', 'ancil_dir', 'cache_dir',
+                 'ancillary_only', 'cache_window', 'preserve_cache', 'num_cpu', 'granule_timeout',
+                 'docleanup', 'version', 'input_prefixes', 'vfire_exe')
+
+    _defaults = {'granule_timeout': DEFAULT_GRANULE_TIMEOUT}
+
+    def __init__(self, **kwargs):
+        for key in self.__slots__:
+            setattr(self, key, kwargs.pop(key, self._defaults.get(key)))
+        if kwargs:
+            raise TypeError('Unknown Active Fires options: {}'.format(', '.join(sorted(kwargs))))
+
+    def __repr__(self):
+        return 'AfireOptions({})'.format(
+            ', '.join(['{}={!r}'.format(key, getattr(self, key)) for key in self.__slots__]))
+
 
 def argument_parser():
     '''
@@ -43,7 +72,12 @@ def argument_parser():
         ''' [default: %(default)s]'''
     help_strings['ancillary_only'] = '''Only process ancillary data, don't run Active Fires.''' \
         ''' [default: %(default)s]'''
-    help_strings['num_cpu'] = '''The number of CPUs to try and use. [default: %(default)s]'''
+    help_strings['num_cpu'] = '''The number of CPUs to try and use for the Active Fires''' \
+        ''' execution. The ancillary\ndata is staged by up to this number of additional''' \
+        ''' processes (at most 8). [default: %(default)s]'''
+    help_strings['granule_timeout'] = '''Kill the Active Fires execution for a granule if it''' \
+        ''' takes longer than this\nnumber of seconds, between 1 and {}.''' \
+        ''' [default: %(default)s seconds]'''.format(MAX_GRANULE_TIMEOUT)
     help_strings['debug'] = '''Always retain intermediate files. [default: %(default)s]'''
     help_strings['verbosity'] = '''Each occurrence increases verbosity 1 level from''' \
         ''' ERROR: -v=WARNING, -vv=INFO, -vvv=DEBUG [default: %(default)s]'''
@@ -137,6 +171,15 @@ def argument_parser():
                         help=help_strings['num_cpu'] if is_expert else argparse.SUPPRESS
                         )
 
+    parser.add_argument('--granule-timeout',
+                        action="store",
+                        dest="granule_timeout",
+                        type=int,
+                        default=DEFAULT_GRANULE_TIMEOUT,
+                        metavar=('SECONDS'),
+                        help=help_strings['granule_timeout'] if is_expert else argparse.SUPPRESS
+                        )
+
     parser.add_argument('-d', '--debug',
                         action="store_true",
                         default=False,
@@ -170,6 +213,10 @@ def argument_parser():
 
     args = parser.parse_args()
 
+    if not 1 <= args.granule_timeout <= MAX_GRANULE_TIMEOUT:
+        parser.error('--granule-timeout must be between 1 and {} seconds, not {}'.format(
+            MAX_GRANULE_TIMEOUT, args.granule_timeout))
+
     # Set up the logging
     levels = [logging.ERROR, logging.WARN, logging.INFO, logging.DEBUG]
     level = levels[args.verbosity if args.verbosity < 4 else 3]
@@ -17,7 +17,7 @@ import logging
 import traceback
 from cffi import FFI
 
-from args import argument_parser
+from args import argument_parser, AfireOptions
 from active_fire_interface import get_afire_inputs, construct_cmd_invocations
 from dispatcher import afire_dispatcher
 from utils import create_dir, setup_cache_dir, clean_cache, cleanup, CsppEnvironment
@@ -37,8 +37,8 @@ def process_afire_inputs(work_dir, afire_options):
     """
 
     #ret_val = 0
-    afire_home = afire_options['afire_home']
-    geo_prefix = 'GITCO' if afire_options['i_band'] else 'GMTCO'
+    afire_home = afire_options.afire_home
+    geo_prefix = 'GITCO' if afire_options.i_band else 'GMTCO'
 
     attempted_runs = []
     successful_runs = []
@@ -50,7 +50,7 @@ def process_afire_inputs(work_dir, afire_options):
     LOG.info('')
 
     # Create a dictionary containing valid inputs and related metadata
-    afire_data_dict, granule_id_list = get_afire_inputs(afire_options['inputs'], afire_options)
+    afire_data_dict, granule_id_list = get_afire_inputs(afire_options.inputs, afire_options)
 
     for gran_key in afire_data_dict.keys():
         for file_key in afire_data_dict[gran_key].keys():
@@ -58,7 +58,7 @@ def process_afire_inputs(work_dir, afire_options):
 
     if (afire_data_dict == {} or granule_id_list == []):
         LOG.info('>>> No valid {} inputs detected, aborting.'.format(
-            'I-band' if afire_options['i_band'] else 'M-band'))
+            'I-band' if afire_options.i_band else 'M-band'))
         return [],[],[],[]
 
     # Add the required command line invocations to the input dict...
@@ -75,50 +75,55 @@ def process_afire_inputs(work_dir, afire_options):
 
     # Clean out product cache files that are too old.
     LOG.info('')
-    if not afire_options['preserve_cache']:
+    if not afire_options.preserve_cache:
         LOG.info(">>> Cleaning the ancillary cache back {} hours...".format(
-            afire_options['cache_window']))
+            afire_options.cache_window))
         first_dt = afire_data_dict[granule_id_list[0]][geo_prefix]['dt']
-        clean_cache(afire_options['cache_dir'], afire_options['cache_window'], first_dt)
+        clean_cache(afire_options.cache_dir, afire_options.cache_window, first_dt)
 
-    # Create the required cache dirs
+    # Create the required cache dirs. Many granules share the same hour, so record each granule's
+    # cache dir name and create each unique dir only once.
     for granule_id in granule_id_list:
-        anc_dir = afire_data_dict[granule_id][geo_prefix]['dt'].strftime('%Y_%m_%d_%j-%Hh')
-        lwm_dir = os.path.join(afire_options['cache_dir'], anc_dir)
-        lwm_dir = create_dir(lwm_dir)
-        if lwm_dir is None:
-            LOG.warn("Unable to create cache dir {} for granule {}".format(lwm_dir, granule_id))
+        afire_data_dict[granule_id]['anc_dir'] = \
+            afire_data_dict[granule_id][geo_prefix]['dt'].strftime('%Y_%m_%d_%j-%Hh')
+    anc_dirs = sorted(set([afire_data_dict[granule_id]['anc_dir']
+                           for granule_id in granule_id_list]))
+    for anc_dir in anc_dirs:
+        lwm_dir = os.path.join(afire_options.cache_dir, anc_dir)
+        if create_dir(lwm_dir) is None:
+            LOG.warn("Unable to create cache dir {}".format(lwm_dir))
 
     # Run the dispatcher
     LOG.info('')
     LOG.info('>>> Running Active Fires')
     LOG.info('')
-    rc_exe_dict, rc_problem_dict = afire_dispatcher(afire_home, afire_data_dict, afire_options)
-    LOG.debug("rc_exe_dict = {}".format(rc_exe_dict))
-    LOG.debug("rc_problem_dict = {}".format(rc_problem_dict))
+    results = afire_dispatcher(afire_home, afire_data_dict, granule_id_list, afire_options)
+    LOG.debug("results = {}".format(results))
 
     # Unless directed not to, cleanup the unaggregated inputs dir
-    if afire_options['docleanup']:
+    if afire_options.docleanup:
         unagg_inputs_dir = os.path.join(work_dir, 'unaggregated_inputs')
         cleanup([unagg_inputs_dir])
 
     # Populate the diagnostic granule ID lists
-    for granule_id in granule_id_list:
+    for granule_id, rc_exe, rc_problem in results:
         attempted_runs.append(granule_id)
-        if rc_exe_dict[granule_id] == 0:
-            if rc_problem_dict[granule_id] == 0:
+        if rc_exe == 0:
+            if rc_problem == 0:
                 successful_runs.append(granule_id)
             else:
                 pass
         else:
             crashed_runs.append(granule_id)
-        if rc_problem_dict[granule_id] != 0:
+        if rc_problem != 0:
             problem_runs.append(granule_id)
 
-    attempted_runs = sorted(list(set(attempted_runs)))
-    successful_runs = sorted(list(set(successful_runs)))
-    crashed_runs = sorted(list(set(crashed_runs)))
-    problem_runs = sorted(list(set(problem_runs)))
+    # Each granule ID has exactly one result, so the lists need no dedup. The results are in
+    # completion order, so sort them for reporting.
+    attempted_runs = sorted(attempted_runs)
+    successful_runs = sorted(successful_runs)
+    crashed_runs = sorted(crashed_runs)
+    problem_runs = sorted(problem_runs)
 
     return attempted_runs, successful_runs, crashed_runs, problem_runs
 
@@ -146,20 +151,21 @@ def main():
         LOG.error('Installation error, Make sure all software components were installed.')
         return 2
 
-    afire_options = {}
-    afire_options['inputs'] = args.inputs
-    afire_options['afire_home'] = os.path.abspath(afire_home)
-    afire_options['i_band'] = args.i_band
-    afire_options['work_dir'] = os.path.abspath(args.work_dir)
-    afire_options['ancil_dir'] = afire_ancil_path
-    afire_options['cache_dir'] = setup_cache_dir(args.cache_dir, afire_options['work_dir'],
-                                                 'CSPP_ACTIVE_FIRE_CACHE_DIR')
-    afire_options['ancillary_only'] = args.ancillary_only
-    afire_options['cache_window'] = args.cache_window
-    afire_options['preserve_cache'] = args.preserve_cache
-    afire_options['num_cpu'] = args.num_cpu
-    afire_options['docleanup'] = docleanup
-    afire_options['version'] = cspp_afire_version
+    afire_options = AfireOptions()
+    afire_options.inputs = args.inputs
+    afire_options.afire_home = os.path.abspath(afire_home)
+    afire_options.i_band = args.i_band
+    afire_options.work_dir = os.path.abspath(args.work_dir)
+    afire_options.ancil_dir = afire_ancil_path
+    afire_options.cache_dir = setup_cache_dir(args.cache_dir, afire_options.work_dir,
+                                              'CSPP_ACTIVE_FIRE_CACHE_DIR')
+    afire_options.ancillary_only = args.ancillary_only
+    afire_options.cache_window = args.cache_window
+    afire_options.preserve_cache = args.preserve_cache
+    afire_options.num_cpu = args.num_cpu
+    afire_options.granule_timeout = args.granule_timeout
+    afire_options.docleanup = docleanup
+    afire_options.version = cspp_afire_version
 
     rc = 0
     try:
@@ -17,41 +17,290 @@ from os.path import basename, dirname, curdir, abspath, isdir, isfile, exists, s
 import logging
 import time
 import shutil
-from glob import glob
 import traceback
+import signal
 import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from subprocess import call, check_call, CalledProcessError
-import numpy as np
 
+import numpy as np
 import h5py
-from netCDF4 import Dataset
 
 from utils import link_files, getURID, execution_time, execute_binary_captured_inject_io, cleanup
-
-from ancillary.stage_ancillary import get_lwm
+from utils import ERROR_RE
 
 LOG = logging.getLogger('dispatcher')
 
+# Chunk cache settings used when opening the AFEDR file to read the fire pixel datasets. The
+# default 1 MiB HDF5 chunk cache is small for the AFEDR chunking.
+CHUNK_CACHE_NBYTES = 16 * 1024 * 1024
+CHUNK_CACHE_NSLOTS = 10007
+
+# Buffer size for the output text file, large enough to hold the fire pixel text for a typical
+# granule, so that it is written with only a few write calls.
+TXT_FILE_BUFSIZE = 1 << 20
+
+# The parts of the AFEDR post-processing which differ between the I-band and M-band algorithms,
+# keyed by afire_options.i_band.
+BAND_CONFIG = {
+    True: {
+        'band': 'I',
+        'af_prefix': 'AFIMG',
+        'fire_grp': '/',
+        'nfire_attr': 'FirePix',
+        'temp_dset': 'FP_T4',
+        'temp_band': 'I04',
+        'pixel_res': [0.375, 0.375],
+        'confidence_doc': '[7,8,9]->[lo,med,hi]',
+        'remove_nasa_file': True,
+    },
+    False: {
+        'band': 'M',
+        'af_prefix': 'AFMOD',
+        'fire_grp': 'Fire Pixels',
+        'nfire_attr': None,
+        'temp_dset': 'FP_T13',
+        'temp_band': 'M13',
+        'pixel_res': [0.75, 0.75],
+        'confidence_doc': '%',
+        'remove_nasa_file': False,
+    },
+}
+
+TXT_FILE_HEADER = \
+    '''# Active Fires {band}-band EDR\n''' \
+    '''#\n''' \
+    '''# source: {source}\n''' \
+    '''# version: {version}\n''' \
+    '''#\n''' \
+    '''# column 1: latitude of fire pixel (degrees)\n''' \
+    '''# column 2: longitude of fire pixel (degrees)\n''' \
+    '''# column 3: {temp_band} brightness temperature of fire pixel (K)\n''' \
+    '''# column 4: Along-scan fire pixel resolution (km)\n''' \
+    '''# column 5: Along-track fire pixel resolution (km)\n''' \
+    '''# column 6: detection confidence ({confidence_doc})\n''' \
+    '''# column 7: fire radiative power (MW)\n''' \
+    '''#\n# number of fire pixels: {nfire}\n''' \
+    '''#'''
+
+# The maximum number of worker processes used to stage the ancillary data, limited further by the
+# number of CPUs we are using. These run in addition to the Active Fires processes (one per CPU),
+# so that staging the ancillary data for the next granules doesn't take a CPU away from vfire.
+ANCILLARY_STAGING_WORKERS = 8
+
+# Per-worker context, set once in each pool worker by _init_worker(), holding the inputs which are
+# common to every granule.
+_WORKER_CTX = {}
+
+
+class GranuleTimeout(Exception):
+    pass
+
+
+def _granule_timeout_handler(signum, frame):
+    '''
+    SIGALRM handler, raising GranuleTimeout in the worker so that a hung "vfire" binary can be
+    killed without blocking the rest of the pool.
+    '''
+    raise GranuleTimeout("Active Fires execution exceeded the granule timeout")
+
+
+def _fire_pixel_dtype(temp_dset):
+    '''
+    Return the structured dtype used to hold the fire pixel data read from the AFEDR file, where
+    temp_dset is the name of the brightness temperature dataset ('FP_T4' or 'FP_T13').
+    '''
+    return np.dtype([('FP_latitude', 'f8'), ('FP_longitude', 'f8'), (temp_dset, 'f8'),
+                     ('FP_confidence', 'i4'), ('FP_power', 'f8')])
+
+
+def _read_fire_pixels(fire_grp, nfire, temp_dset):
+    '''
+    Read the fire pixel datasets from the h5py group fire_grp into a structured array.
+    '''
+    fire_data = np.empty(int(nfire), dtype=_fire_pixel_dtype(temp_dset))
+    for dset in fire_data.dtype.names:
+        fire_data[dset] = fire_grp[dset][...]
+
+    return fire_data
+
+
+def _write_fire_text(fire_data, fire_pixel_res, txt_file_header, output_txt_file, band):
+    '''
+    Write the fire pixel data to the output text file, formatting all of the fire pixels in one
+    vectorized pass rather than line by line. The fields of the structured array fire_data are
+    expected to be [latitude, longitude, brightness temperature, confidence, power]. Returns the
+    problem return code.
+    '''
+    FP_latitude, FP_longitude, FP_temp, FP_confidence, FP_power = [
+        fire_data[name] for name in fire_data.dtype.names]
+    nfire = len(FP_latitude)
+    Along_scan_pixel_dim, Along_track_pixel_dim = fire_pixel_res
+
+    fire_array = np.column_stack([
+        FP_latitude, FP_longitude, FP_temp,
+        np.full(nfire, Along_scan_pixel_dim), np.full(nfire, Along_track_pixel_dim),
+        FP_confidence, FP_power
+    ])
+    format_str = '%13.8f, %13.8f, %13.8f, %6.3f, %6.3f, %4d, %13.8f'
+
+    LOG.info("\tWriting output {}-band text file {}".format(band, output_txt_file))
+    txt_file_obj = open(output_txt_file, 'x', buffering=TXT_FILE_BUFSIZE, encoding='ascii',
+                        newline='\n')
+
+    try:
+        np.savetxt(txt_file_obj, fire_array, fmt=format_str, header=txt_file_header, comments='')
+        txt_file_obj.close()
+    except Exception:
+        txt_file_obj.close()
+        LOG.warning("\tProblem writing Active fire text file: {}".format(output_txt_file))
+        LOG.warn(traceback.format_exc())
+        return 1
+
+    return 0
+
+
+def _postprocess_afedr(run_dir, granule_dict, afire_options, band_cfg):
+    '''
+    Update the global attributes of the AFEDR file in run_dir, and write any fire pixels to the
+    output text file, using the I-band or M-band settings in band_cfg (an entry of BAND_CONFIG).
+    Returns the problem return code.
+    '''
+    rc_problem = 0
+    granule_id = granule_dict['granule_id']
+    old_output_file = pjoin(run_dir, granule_dict['AFEDR']['file'])
+
+    try:
+        creation_dt = granule_dict['creation_dt']
+
+        # The attribute and header values common to both the I-band and M-band outputs
+        output_file_base = basename(old_output_file)
+        date_created = creation_dt.isoformat()
+        urid = getURID(creation_dt)['URID']
+        history_string = 'CSPP Active Fires version: {}'.format(afire_options.version)
+
+        # Check whether the target AF text file exists, and remove it.
+        output_txt_file = '{}.txt'.format(splitext(old_output_file)[0])
+        if exists(output_txt_file):
+            LOG.debug('{} exists, removing.'.format(output_txt_file))
+            os.remove(output_txt_file)
+
+        # The attribute values are converted to fixed length strings up front, and all written
+        # before any data is read from the file.
+        attrs_to_set = [(name, np.bytes_(value)) for name, value in (
+            ('date_created', date_created),
+            ('granule_id', granule_id),
+            ('history', history_string),
+            ('Metadata_Link', output_file_base),
+            ('id', urid))]
+
+        # Update the attributes
+        h5_file_obj = h5py.File(old_output_file, "a", rdcc_nbytes=CHUNK_CACHE_NBYTES,
+                                rdcc_nslots=CHUNK_CACHE_NSLOTS)
+        for name, value in attrs_to_set:
+            h5_file_obj.attrs.create(name, value)
+
+        # Extract desired data from the NetCDF4 file, for output to the text file. The I-band
+        # file records the number of fire pixels in a global attribute, while for the M-band file
+        # we use the length of the fire pixel datasets. The netCDF4 "nfire" dimension scale isn't
+        # used, since it is left at zero length in HDF5 if the dimension is unlimited.
+        fire_grp = h5_file_obj[band_cfg['fire_grp']]
+        if band_cfg['nfire_attr'] is not None:
+            nfire = h5_file_obj.attrs[band_cfg['nfire_attr']][0]
+        else:
+            nfire = fire_grp['FP_latitude'].shape[0]
+
+        LOG.info("\tGranule {} has {} fire pixels".format(granule_id, nfire))
+
+        # Granules without fire pixels (the common case) have no text file, so we are done.
+        if int(nfire) == 0:
+            h5_file_obj.close()
+            return rc_problem
+
+        fire_data = _read_fire_pixels(fire_grp, nfire, band_cfg['temp_dset'])
+        h5_file_obj.close()
+
+        # Write the associated fire data to a text file...
+
+        txt_file_header = TXT_FILE_HEADER.format(source=output_file_base,
+                                                 version=history_string, nfire=nfire, **band_cfg)
+
+        if band_cfg['remove_nasa_file']:
+            nasa_file = output_txt_file.replace('dev', 'dev_nasa')
+            if exists(nasa_file):
+                LOG.debug('{} exists, removing.'.format(nasa_file))
+                os.remove(nasa_file)
+
+        rc_problem = _write_fire_text(fire_data, band_cfg['pixel_res'], txt_file_header,
+                                      output_txt_file, band_cfg['band'])
+
+    except Exception:
+        rc_problem = 1
+        LOG.warning("\tProblem setting attributes in output file {}".format(old_output_file))
+        LOG.debug(traceback.format_exc())
+
+    return rc_problem
+
+
+def _init_worker(afire_home, afire_options):
+    '''
+    Pool worker initializer, storing the inputs common to all granules in the worker context so
+    that they are passed to each worker once, rather than with every task.
+    '''
+    _WORKER_CTX['afire_home'] = afire_home
+    _WORKER_CTX['afire_options'] = afire_options
+
 
-def afire_submitter(args):
+def _stage_ancillary(granule_dict):
+    '''
+    Download and stage the required ancillary data for a single granule. This runs in the
+    ancillary staging pool, separately from the Active Fires execution, so that the ancillary
+    generation for later granules overlaps the execution of earlier ones. Returns whether the
+    ancillary generation failed, and the LWM file.
+    '''
+    # Deferred, so that netCDF4 and the GridIP modules are only loaded by the workers which stage
+    # the ancillary data.
+    from ancillary.stage_ancillary import get_lwm
+
+    afire_options = _WORKER_CTX['afire_options']
+    granule_id = granule_dict['granule_id']
+
+    LOG.info("\tStaging the required ancillary data for granule_id {}...".format(granule_id))
+    failed_ancillary = False
+    lwm_file = None
+    try:
+        rc_ancil, rc_ancil_dict, lwm_file = get_lwm(afire_options, granule_dict)
+        failed_ancillary = True if rc_ancil != 0 else False
+    except Exception as err:
+        failed_ancillary = True
+        LOG.warn('\tProblem generating LWM for granule_id {}'.format(granule_id))
+        LOG.error(err)
+        LOG.debug(traceback.format_exc())
+
+    return failed_ancillary, lwm_file
+
+
+def afire_submitter(granule_dict):
     '''
     This routine encapsulates the single unit of work, multiple instances of which are submitted to
-    the multiprocessing queue. It takes as input whatever is required to complete the work unit,
-    and returns return values and output logging from the external process.
+    the multiprocessing queue. It takes as input the granule dictionary for the work unit, whose
+    ancillary data has already been staged by _stage_ancillary() (the inputs common to all work
+    units are taken from the worker context), and returns return values and output logging from
+    the external process.
     '''
 
     # This try block wraps all code in this worker function, to capture any exceptions.
     try:
 
-        granule_dict = args['granule_dict']
-        afire_home = args['afire_home']
-        afire_options = args['afire_options']
+        afire_home = _WORKER_CTX['afire_home']
+        afire_options = _WORKER_CTX['afire_options']
 
         granule_id = granule_dict['granule_id']
         run_dir = granule_dict['run_dir']
         cmd = granule_dict['cmd']
-        work_dir = afire_options['work_dir']
+        lwm_file = granule_dict['lwm_file']
+        work_dir = afire_options.work_dir
         env_vars = {}
 
         rc_exe = 0
@@ -64,8 +313,6 @@ def afire_submitter(args):
         LOG.debug("work_dir = {}".format(work_dir))
         LOG.debug("env_vars = {}".format(env_vars))
 
-        current_dir = os.getcwd()
-
         LOG.info("Processing granule_id {}...".format(granule_id))
 
         # Create the run dir for this input file
@@ -78,307 +325,122 @@ def afire_submitter(args):
             else:
                 log_idx += 1
 
-        os.chdir(run_dir)
-
-        # Download and stage the required ancillary data for this input file
-        LOG.info("\tStaging the required ancillary data for granule_id {}...".format(granule_id))
-        failed_ancillary = False
+        # Link the required files and directories into the work directory. All paths are
+        # absolute, and the binary is run with the run dir as its working directory, so the
+        # worker never needs to change its own directory.
+        paths_to_link = [
+            pjoin(afire_home, 'vendor', afire_options.vfire_exe),
+            lwm_file,
+        ] + [granule_dict[key]['file'] for key in afire_options.input_prefixes]
+        number_linked = link_files(run_dir, paths_to_link)
+        LOG.debug("\tWe are linking {} files to the run dir:".format(number_linked))
+        for linked_files in paths_to_link:
+            LOG.debug("\t{}".format(linked_files))
+
+        start_time = time.time()
+
+        # Arm an alarm around the binary execution, so a hung granule is killed rather than
+        # wedging the worker.
+        granule_timeout = afire_options.granule_timeout
+        signal.signal(signal.SIGALRM, _granule_timeout_handler)
+        signal.alarm(granule_timeout)
         try:
-            rc_ancil, rc_ancil_dict, lwm_file = get_lwm(afire_options, granule_dict)
-            failed_ancillary = True if rc_ancil != 0 else False
-        except Exception as err:
-            failed_ancillary = True
-            LOG.warn('\tProblem generating LWM for granule_id {}'.format(granule_id))
-            LOG.error(err)
-            LOG.debug(traceback.format_exc())
-
-        # Run the active fire binary
-        if afire_options['ancillary_only']:
-
-            LOG.info('''\tAncillary only, skipping Active Fire execution for granule_id {}'''.format
-                     (granule_id))
-            if failed_ancillary:
-                LOG.warn('\tAncillary granulation failed for granule_id {}'.format(granule_id))
-                rc_problem = 1
-
-            os.chdir(current_dir)
-
-        elif failed_ancillary:
-
-            LOG.warn('\tAncillary granulation failed for granule_id {}'.format(granule_id))
-            os.chdir(current_dir)
-            rc_problem = 1
-
-        else:
-            # Link the required files and directories into the work directory...
-            paths_to_link = [
-                pjoin(afire_home, 'vendor', afire_options['vfire_exe']),
-                lwm_file,
-            ] + [granule_dict[key]['file'] for key in afire_options['input_prefixes']]
-            number_linked = link_files(run_dir, paths_to_link)
-            LOG.debug("\tWe are linking {} files to the run dir:".format(number_linked))
-            for linked_files in paths_to_link:
-                LOG.debug("\t{}".format(linked_files))
-
-            # Contruct a dictionary of error conditions which should be logged.
-            error_keys = ['FAILURE', 'failure', 'FAILED', 'failed', 'FAIL', 'fail',
-                          'ERROR', 'error', 'ERR', 'err',
-                          'ABORTING', 'aborting', 'ABORT', 'abort']
-            error_dict = {x: {'pattern': x, 'count_only': False, 'count': 0, 'max_count': None,
-                              'log_str': ''}
-                          for x in error_keys}
-            error_dict['error_keys'] = error_keys
-
-            start_time = time.time()
-
             rc_exe, exe_out = execute_binary_captured_inject_io(
-                run_dir, cmd, error_dict,
+                run_dir, cmd, error_re=ERROR_RE, kill_children=True,
                 log_execution=False, log_stdout=False, log_stderr=False,
                 **env_vars)
-
-            end_time = time.time()
-
-            afire_time = execution_time(start_time, end_time)
-            LOG.debug("\tafire execution of {} took {:9.6f} seconds".format(
-                granule_id, afire_time['delta']))
-            LOG.info(
-                "\tafire execution of {} took {} days, {} hours, {} minutes, {:8.6f} seconds"
-                .format(granule_id, afire_time['days'], afire_time['hours'],
-                        afire_time['minutes'], afire_time['seconds']))
-
-            LOG.debug("\tGranule ID: {}, rc_exe = {}".format(granule_id, rc_exe))
-
-            os.chdir(current_dir)
-
-            # Write the afire output to a log file, and parse it to determine the output
-            creation_dt = datetime.utcnow()
-            timestamp = creation_dt.isoformat()
-            logname = "{}_{}.log".format(run_dir, timestamp)
-            log_dir = dirname(run_dir)
-            logpath = pjoin(log_dir, logname)
-            logfile_obj = open(logpath, 'w')
-            for line in exe_out.splitlines():
-                logfile_obj.write(str(line) + "\n")
-            logfile_obj.close()
-
-            # Update the various file global attributes
+        except GranuleTimeout as err:
+            rc_exe = -signal.SIGALRM
+            timeout_msg = "{} ({} seconds) for granule {}".format(err, granule_timeout, granule_id)
+            LOG.warn("\t{}".format(timeout_msg))
+            # Keep whatever the binary printed before it was killed, ahead of the timeout message.
+            exe_out = getattr(err, 'out_str', '')
+            if exe_out and not exe_out.endswith("\n"):
+                exe_out += "\n"
+            exe_out += timeout_msg
+        finally:
+            signal.alarm(0)
+
+        end_time = time.time()
+
+        afire_time = execution_time(start_time, end_time)
+        LOG.debug("\tafire execution of {} took {:9.6f} seconds".format(
+            granule_id, afire_time['delta']))
+        LOG.info(
+            "\tafire execution of {} took {} days, {} hours, {} minutes, {:8.6f} seconds"
+            .format(granule_id, afire_time['days'], afire_time['hours'],
+                    afire_time['minutes'], afire_time['seconds']))
+
+        LOG.debug("\tGranule ID: {}, rc_exe = {}".format(granule_id, rc_exe))
+
+        # Write the afire output to a log file, and parse it to determine the output
+        creation_dt = datetime.utcnow()
+        timestamp = creation_dt.isoformat()
+        logname = "{}_{}.log".format(run_dir, timestamp)
+        log_dir = dirname(run_dir)
+        logpath = pjoin(log_dir, logname)
+        if exe_out and not exe_out.endswith("\n"):
+            exe_out += "\n"
+        with open(logpath, 'w') as logfile_obj:
+            logfile_obj.write(exe_out)
+
+        # Update the AFEDR file attributes, and write the fire data to a text file.
+        rc_problem = _postprocess_afedr(run_dir, granule_dict, afire_options,
+                                        BAND_CONFIG[afire_options.i_band])
+
+        # Move output files to the work directory
+        LOG.debug("\tMoving output files from {} to {}".format(run_dir, work_dir))
+        af_prefix = BAND_CONFIG[afire_options.i_band]['af_prefix']
+        af_suffix = 'nc' if afire_options.i_band else 'nc' # FIXME: NOAA should fix NC output for I-band!
+        outfile_suffixes = ('.{}'.format(af_suffix), '.txt')
+        outfiles = [entry.path for entry in os.scandir(run_dir)
+                    if entry.is_file() and entry.name.startswith(af_prefix)
+                    and entry.name.endswith(outfile_suffixes)]
+
+        # The run dir is normally on the same filesystem as the work dir, so try a single
+        # rename first, falling back to a copying move (e.g. if the run dir is a mount point).
+        for outfile in outfiles:
+            dest_file = pjoin(work_dir, basename(outfile))
             try:
-
-                old_output_file = pjoin(run_dir, granule_dict['AFEDR']['file'])
-                creation_dt = granule_dict['creation_dt']
-
-                # Check whether the target AF text file exists, and remove it.
-                output_txt_file = '{}.txt'.format(splitext(old_output_file)[0])
-                if exists(output_txt_file):
-                    LOG.debug('{} exists, removing.'.format(output_txt_file))
-                    os.remove(output_txt_file)
-
-                #
-                # Update the attributes, moving to the end
-                #
-                if afire_options['i_band']:
-
-                    # Update the I-band attributes, and write the fire data to a text file.
-                    h5_file_obj = h5py.File(old_output_file, "a")
-                    h5_file_obj.attrs.create('date_created', np.string_(creation_dt.isoformat()))
-                    h5_file_obj.attrs.create('granule_id', np.string_(granule_id))
-                    history_string = 'CSPP Active Fires version: {}'.format(afire_options['version'])
-                    h5_file_obj.attrs.create('history', np.string_(history_string))
-                    h5_file_obj.attrs.create('Metadata_Link', np.string_(basename(old_output_file)))
-                    h5_file_obj.attrs.create('id', np.string_(getURID(creation_dt)['URID']))
-
-                    # Extract desired data from the NetCDF4 file, for output to the text file
-                    nfire = h5_file_obj.attrs['FirePix'][0]
-                    if int(nfire) > 0:
-                        fire_datasets = ['FP_latitude', 'FP_longitude', 'FP_T4', 'FP_confidence',
-                                         'FP_power']
-                        fire_data = []
-                        for dset in fire_datasets:
-                            fire_data.append(h5_file_obj['/'+dset][:])
-
-                    h5_file_obj.close()
-
-
-                    # Check if there are any fire pixels, and write the associated fire data to
-                    # a text file...
-
-                    LOG.info("\tGranule {} has {} fire pixels".format(granule_id, nfire))
-
-                    if int(nfire) > 0:
-                        Along_scan_pixel_dim = 0.375
-                        Along_track_pixel_dim = 0.375
-                        fire_pixel_res = [Along_scan_pixel_dim, Along_track_pixel_dim]
-
-                        format_str = '''{0:13.8f}, {1:13.8f}, {2:13.8f}, {5:6.3f}, {6:6.3f},''' \
-                            ''' {3:4d}, {4:13.8f}'''
-
-                        txt_file_header = \
-                            '''# Active Fires I-band EDR\n''' \
-                            '''#\n''' \
-                            '''# source: {}\n''' \
-                            '''# version: {}\n''' \
-                            '''#\n''' \
-                            '''# column 1: latitude of fire pixel (degrees)\n''' \
-                            '''# column 2: longitude of fire pixel (degrees)\n''' \
-                            '''# column 3: I04 brightness temperature of fire pixel (K)\n''' \
-                            '''# column 4: Along-scan fire pixel resolution (km)\n''' \
-                            '''# column 5: Along-track fire pixel resolution (km)\n''' \
-                            '''# column 6: detection confidence ([7,8,9]->[lo,med,hi])\n''' \
-                            '''# column 7: fire radiative power (MW)\n''' \
-                            '''#\n# number of fire pixels: {}\n''' \
-                            '''#'''.format(basename(old_output_file), history_string, nfire)
-
-                        nasa_file = output_txt_file.replace('dev','dev_nasa')
-                        if exists(nasa_file):
-                            LOG.debug('{} exists, removing.'.format(nasa_file))
-                            os.remove(nasa_file)
-
-                        LOG.info("\tWriting output text file {}".format(output_txt_file))
-                        txt_file_obj = open(output_txt_file, 'x')
-
-                        try:
-                            txt_file_obj.write(txt_file_header + "\n")
-
-                            for FP_latitude, FP_longitude, FP_R13, FP_confidence, FP_power in zip(
-                                    *fire_data):
-                                fire_vars = [FP_latitude, FP_longitude, FP_R13, FP_confidence, FP_power]
-                                line = format_str.format(*(fire_vars + fire_pixel_res))
-                                txt_file_obj.write(line + "\n")
-
-                            txt_file_obj.close()
-                        except Exception:
-                            txt_file_obj.close()
-                            rc_problem = 1
-                            LOG.warning("\tProblem writing Active fire text file: {}".format(
-                                output_txt_file))
-                            LOG.warn(traceback.format_exc())
-                else:
-
-                    # Update the M-band attributes, and write the fire data to a text file.
-
-                    nc_file_obj = Dataset(old_output_file, "a", format="NETCDF4")
-                    setattr(nc_file_obj, 'date_created', creation_dt.isoformat())
-                    setattr(nc_file_obj, 'granule_id', granule_id)
-                    history_string = 'CSPP Active Fires version: {}'.format(
-                        afire_options['version'])
-                    setattr(nc_file_obj, 'history', history_string)
-                    setattr(nc_file_obj, 'Metadata_Link', basename(old_output_file))
-                    setattr(nc_file_obj, 'id', getURID(creation_dt)['URID'])
-
-                    # Extract desired data from the NetCDF4 file, for output to the text file
-                    nfire = len(nc_file_obj['Fire Pixels'].dimensions['nfire'])
-                    if int(nfire) > 0:
-                        fire_datasets = ['FP_latitude', 'FP_longitude', 'FP_T13', 'FP_confidence',
-                                         'FP_power']
-                        fire_data = []
-                        for dset in fire_datasets:
-                            fire_data.append(nc_file_obj['Fire Pixels'].variables[dset][:])
-                    nc_file_obj.close()
-
-                    # Check if there are any fire pixels, and write the associated fire data to
-                    # a text file...
-
-                    LOG.info("\tGranule {} has {} fire pixels".format(granule_id, nfire))
-
-                    if int(nfire) > 0:
-                        Along_scan_pixel_dim = 0.75
-                        Along_track_pixel_dim = 0.75
-                        fire_pixel_res = [Along_scan_pixel_dim, Along_track_pixel_dim]
-
-                        format_str = '''{0:13.8f}, {1:13.8f}, {2:13.8f}, {5:6.3f}, {6:6.3f},''' \
-                            ''' {3:4d}, {4:13.8f}'''
-
-                        txt_file_header = \
-                            '''# Active Fires M-band EDR\n''' \
-                            '''#\n''' \
-                            '''# source: {}\n''' \
-                            '''# version: {}\n''' \
-                            '''#\n''' \
-                            '''# column 1: latitude of fire pixel (degrees)\n''' \
-                            '''# column 2: longitude of fire pixel (degrees)\n''' \
-                            '''# column 3: M13 brightness temperature of fire pixel (K)\n''' \
-                            '''# column 4: Along-scan fire pixel resolution (km)\n''' \
-                            '''# column 5: Along-track fire pixel resolution (km)\n''' \
-                            '''# column 6: detection confidence (%)\n''' \
-                            '''# column 7: fire radiative power (MW)\n''' \
-                            '''#\n# number of fire pixels: {}\n''' \
-                            '''#'''.format(basename(old_output_file), history_string, nfire)
-
-                        LOG.info("\tWriting output text file {}".format(output_txt_file))
-                        txt_file_obj = open(output_txt_file, 'x')
-
-                        try:
-                            txt_file_obj.write(txt_file_header + "\n")
-
-                            for FP_latitude, FP_longitude, FP_T13, FP_confidence, FP_power in zip(
-                                    *fire_data):
-                                fire_vars = [FP_latitude, FP_longitude, FP_T13, FP_confidence, FP_power]
-                                line = format_str.format(*(fire_vars + fire_pixel_res))
-                                txt_file_obj.write(line + "\n")
-
-                            txt_file_obj.close()
-                        except Exception:
-                            txt_file_obj.close()
-                            rc_problem = 1
-                            LOG.warning("\tProblem writing Active fire text file: {}".format(
-                                output_txt_file))
-                            LOG.warn(traceback.format_exc())
-
+                try:
+                    os.replace(outfile, dest_file)
+                except OSError:
+                    shutil.move(outfile, dest_file)
             except Exception:
                 rc_problem = 1
-                LOG.warning("\tProblem setting attributes in output file {}".format(
-                    old_output_file))
+                LOG.warning("\tProblem moving output {} from {} to {}".format(
+                    outfile, run_dir, work_dir))
                 LOG.debug(traceback.format_exc())
 
-            # Move output files to the work directory
-            LOG.debug("\tMoving output files from {} to {}".format(run_dir, work_dir))
-            af_prefix = 'AFIMG' if afire_options['i_band'] else 'AFMOD'
-            af_suffix = 'nc' if afire_options['i_band'] else 'nc' # FIXME: NOAA should fix NC output for I-band!
-            outfiles = glob(pjoin(run_dir, '{}*.{}'.format(af_prefix, af_suffix))) \
-                     + glob(pjoin(run_dir, '{}*.txt'.format(af_prefix)))
-
-            for outfile in outfiles:
-                try:
-                    shutil.move(outfile, work_dir)
-                except Exception:
-                    rc_problem = 1
-                    LOG.warning("\tProblem moving output {} from {} to {}".format(
-                        outfile, run_dir, work_dir))
-                    LOG.debug(traceback.format_exc())
-
         # If no problems, remove the run dir
-        if (rc_exe == 0) and (rc_problem == 0) and afire_options['docleanup']:
+        if (rc_exe == 0) and (rc_problem == 0) and afire_options.docleanup:
                 cleanup([run_dir])
 
     except Exception:
+        rc_problem = 1
         LOG.warn("\tGeneral warning for {}".format(granule_id))
         LOG.debug(traceback.format_exc())
-        os.chdir(current_dir)
         #raise
 
     return [granule_id, rc_exe, rc_problem, exe_out]
 
 
-def afire_dispatcher(afire_home, afire_data_dict, afire_options):
+def afire_dispatcher(afire_home, afire_data_dict, granule_id_list, afire_options):
     """
-    Dispatch one or more Active Fires jobs to the multiprocessing pool, and report back the final
-    job statuses.
+    Dispatch one or more Active Fires jobs (one for each of the granule IDs in granule_id_list) to
+    the multiprocessing pool, and report back the final job statuses, as a list of
+    (granule_id, rc_exe, rc_problem) tuples in the order that the jobs completed.
     """
 
-    # Construct a list of task dicts...
-    granule_id_list = sorted(afire_data_dict.keys())
-    afire_tasks = []
-    for granule_id in granule_id_list:
-        args = {'granule_dict': afire_data_dict[granule_id],
-                'afire_home': afire_home,
-                'afire_options': afire_options}
-        afire_tasks.append(args)
+    # Construct a list of granule dicts. The inputs common to all tasks are passed to each worker
+    # once, through the pool initializer.
+    afire_tasks = [afire_data_dict[granule_id] for granule_id in granule_id_list]
 
     # Setup the processing pool
     cpu_count = multiprocessing.cpu_count()
     LOG.info('There are {} available CPUs'.format(cpu_count))
 
-    requested_cpu_count = afire_options['num_cpu']
+    requested_cpu_count = afire_options.num_cpu
 
     if requested_cpu_count is not None:
         LOG.info('We have requested {} {}'.format(requested_cpu_count,
@@ -394,17 +456,74 @@ def afire_dispatcher(afire_home, afire_data_dict, afire_options):
         cpus_to_use = cpu_count
 
     LOG.info('We are using {}/{} available CPUs'.format(cpus_to_use, cpu_count))
-    pool = multiprocessing.Pool(cpus_to_use)
 
-    # Submit the Active Fire tasks to the processing pool
-    timeout = 9999999
+    # Stage the ancillary data in a separate pool, and submit each granule to the Active Fire
+    # processing pool as soon as its ancillary data is ready, so that the ancillary generation for
+    # later granules overlaps the execution of earlier ones. The staging pool is in addition to the
+    # cpus_to_use Active Fire processes, so up to cpus_to_use + stage_workers worker processes run
+    # at once. The results are collected as each granule completes rather than waiting for the
+    # slowest one. Each worker enforces its own granule timeout, so a single hung granule cannot
+    # block the others.
     result_list = []
+    task_str = "task" if len(afire_tasks) == 1 else "tasks"
+    stage_workers = min(ANCILLARY_STAGING_WORKERS, cpus_to_use)
+    LOG.info('Staging the ancillary data with {} additional {}'.format(
+        stage_workers, "process" if stage_workers == 1 else "processes"))
 
     start_time = time.time()
 
-    LOG.info("Submitting {} Active Fire {} to the pool...".format(
-        len(afire_tasks), "task" if len(afire_tasks) == 1 else "tasks"))
-    result_list = pool.map_async(afire_submitter, afire_tasks).get(timeout)
+    LOG.info("Submitting {} Active Fire {} to the pool...".format(len(afire_tasks), task_str))
+    with ProcessPoolExecutor(max_workers=stage_workers, initializer=_init_worker,
+                             initargs=(afire_home, afire_options)) as stage_executor, \
+            ProcessPoolExecutor(max_workers=cpus_to_use, initializer=_init_worker,
+                                initargs=(afire_home, afire_options)) as executor:
+
+        stage_future_dict = {stage_executor.submit(_stage_ancillary, task): task
+                             for task in afire_tasks}
+        future_dict = {}
+
+        for stage_future in as_completed(stage_future_dict):
+            granule_dict = stage_future_dict[stage_future]
+            granule_id = granule_dict['granule_id']
+            try:
+                failed_ancillary, lwm_file = stage_future.result()
+            except Exception:
+                LOG.warn('\tProblem generating LWM for granule_id {}'.format(granule_id))
+                LOG.debug(traceback.format_exc())
+                failed_ancillary, lwm_file = True, None
+
+            # Run the active fire binary, unless we are only staging the ancillary data or the
+            # ancillary generation failed.
+            exe_out = "Finished the Active Fires granule {}".format(granule_id)
+            if afire_options.ancillary_only:
+                LOG.info('\tAncillary only, skipping Active Fire execution for granule_id {}'
+                         .format(granule_id))
+                if failed_ancillary:
+                    LOG.warn('\tAncillary granulation failed for granule_id {}'.format(
+                        granule_id))
+                result_list.append([granule_id, 0, int(failed_ancillary), exe_out])
+            elif failed_ancillary:
+                LOG.warn('\tAncillary granulation failed for granule_id {}'.format(granule_id))
+                result_list.append([granule_id, 0, 1, exe_out])
+            else:
+                granule_dict['lwm_file'] = lwm_file
+                future_dict[executor.submit(afire_submitter, granule_dict)] = granule_dict
+                continue
+
+            LOG.info("Completed {}/{} Active Fire {}".format(
+                len(result_list), len(afire_tasks), task_str))
+
+        for future in as_completed(future_dict):
+            try:
+                result_list.append(future.result())
+            except Exception:
+                granule_id = future_dict[future]['granule_id']
+                LOG.warn("\tActive Fire task for granule_id {} did not complete".format(
+                    granule_id))
+                LOG.debug(traceback.format_exc())
+                result_list.append([granule_id, 1, 1, ''])
+            LOG.info("Completed {}/{} Active Fire {}".format(
+                len(result_list), len(afire_tasks), task_str))
 
     end_time = time.time()
 
@@ -416,8 +535,7 @@ def afire_dispatcher(afire_home, afire_data_dict, afire_options):
                 total_afire_time['minutes'], total_afire_time['seconds']))
     LOG.info('')
 
-    rc_exe_dict = {}
-    rc_problem_dict = {}
+    results = []
 
     # Loop through each of the Active Fire results collect error information
     for result in result_list:
@@ -426,10 +544,9 @@ def afire_dispatcher(afire_home, afire_data_dict, afire_options):
             granule_id, afire_rc, problem_rc))
 
         # Did the actual afire binary succeed?
-        rc_exe_dict[granule_id] = afire_rc
-        rc_problem_dict[granule_id] = problem_rc
+        results.append((granule_id, afire_rc, problem_rc))
 
-    return rc_exe_dict, rc_problem_dict
+    return results
 
 
 # Some information about simulating an exe segfault.
@@ -19,6 +19,7 @@ import traceback
 from datetime import datetime
 
 from utils import create_dir, link_files, execution_time, execute_binary_captured_inject_io
+from utils import ERROR_RE
 
 LOG = logging.getLogger('unaggregate')
 
@@ -75,7 +76,7 @@ def nagg_submitter(args):
         agg_input_file = args['agg_input_file']
         unagg_inputs_dir = args['unagg_inputs_dir']
         afire_options = args['afire_options']
-        work_dir = afire_options['work_dir']
+        work_dir = afire_options.work_dir
         env_vars = {}
 
         rc_exe = 0
@@ -119,20 +120,11 @@ def nagg_submitter(args):
         #cmd = '''sleep 0.5; echo "Running nagg on {0:}"; exit 0'''.format(
                 #os.path.basename(agg_input_file))
 
-        # Contruct a dictionary of error conditions which should be logged.
-        error_keys = ['FAILURE', 'failure', 'FAILED', 'failed', 'FAIL', 'fail',
-                      'ERROR', 'error', 'ERR', 'err',
-                      'ABORTING', 'aborting', 'ABORT', 'abort']
-        error_dict = {x: {'pattern': x, 'count_only': False, 'count': 0, 'max_count': None,
-                          'log_str': ''}
-                      for x in error_keys}
-        error_dict['error_keys'] = error_keys
-
         if cmd is not None:
             start_time = time.time()
 
             rc_exe, exe_out = execute_binary_captured_inject_io(
-                unagg_inputs_dir, cmd, error_dict,
+                unagg_inputs_dir, cmd, error_re=ERROR_RE,
                 log_execution=False, log_stdout=False, log_stderr=False,
                 **env_vars)
 
@@ -179,7 +171,7 @@ def unaggregate_inputs(afire_home, agg_input_files, afire_options):
     aggregated input files.
     '''
 
-    unagg_inputs_dir = os.path.join(afire_options['work_dir'], 'unaggregated_inputs')
+    unagg_inputs_dir = os.path.join(afire_options.work_dir, 'unaggregated_inputs')
     unagg_inputs_dir = create_dir(unagg_inputs_dir)
 
     # Construct a list of task dicts...
@@ -202,7 +194,7 @@ def unaggregate_inputs(afire_home, agg_input_files, afire_options):
     cpu_count = multiprocessing.cpu_count()
     LOG.debug('There are {} available CPUs'.format(cpu_count))
 
-    requested_cpu_count = afire_options['num_cpu']
+    requested_cpu_count = afire_options.num_cpu
 
     if requested_cpu_count is not None:
         LOG.debug('We have requested {} {}'.format(
@@ -14,11 +14,11 @@ Licensed under GNU GPLv3.
 import os
 import sys
 import re
-import string
 import logging
 import log_common
 import traceback
 import time
+import signal
 from glob import glob
 import types
 import fileinput
@@ -36,6 +36,11 @@ LOG = logging.getLogger(__name__)
 PROFILING_ENABLED = os.environ.get('CSPP_PROFILE', None) is not None
 STRACE_ENABLED = os.environ.get('CSPP_STRACE', None) is not None
 
+# Error conditions in the stdout of an external process which should be logged. These are compiled
+# once into a single case-insensitive alternation, so each line of output is scanned only once.
+ERROR_PATTERNS = ['FAILURE', 'FAILED', 'FAIL', 'ERROR', 'ERR', 'ABORTING', 'ABORT']
+ERROR_RE = re.compile('|'.join(ERROR_PATTERNS), re.IGNORECASE)
+
 
 def split_search_path(s):
     '''
@@ -385,11 +390,33 @@ class UnexpectedEndOfStream(Exception):
     pass
 
 
-def execute_binary_captured_inject_io(work_dir, cmd, err_dict, log_execution=True, log_stdout=True,
-                                      log_stderr=True, **kv):
+def _child_pids(pid):
+    '''
+    Return the process IDs of the direct children of process pid, found by scanning /proc.
+    '''
+    child_pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{}/stat'.format(entry)) as stat_obj:
+                # The parent PID is the second field after the parenthesised command name.
+                ppid = int(stat_obj.read().rsplit(')', 1)[1].split()[1])
+        except (IOError, OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            child_pids.append(int(entry))
+
+    return child_pids
+
+
+def execute_binary_captured_inject_io(work_dir, cmd, log_execution=True, log_stdout=True,
+                                      log_stderr=True, error_re=None, kill_children=False, **kv):
     '''
     Execute an external script, capturing stdout and stderr without blocking the
-    called script.
+    called script. Lines of stdout matching the compiled regex error_re are passed to the logger.
+    If kill_children is True, the direct children of the shell are also killed if we are
+    interrupted.
     '''
 
     LOG.debug('executing {} with kv={}'.format(cmd, kv))
@@ -406,90 +433,92 @@ def execute_binary_captured_inject_io(work_dir, cmd, err_dict, log_execution=Tru
     nbsr_stdout = NonBlockingStreamReader(pop.stdout)
     nbsr_stderr = NonBlockingStreamReader(pop.stderr)
 
-    error_keys = err_dict['error_keys']
-    del(err_dict['error_keys'])
-
-    # get the output
+    # Read the process output. If we are interrupted (for example by a timeout alarm), kill the
+    # process (and optionally the processes started by the shell) before passing the exception on,
+    # with the output gathered so far attached to it as out_str.
     out_str = ""
-    while pop.poll() is None and nbsr_stdout.thread.is_alive() and nbsr_stderr.thread.is_alive():
+    try:
+        while (pop.poll() is None and nbsr_stdout.thread.is_alive()
+               and nbsr_stderr.thread.is_alive()):
 
-        '''
-        Trawl through the stdout stream
-        '''
-        output_stdout = nbsr_stdout.readline(0.01)  # 0.01 secs to let the shell output the result
-
-        if output_stdout is not None:
-
-            # Gather the stdout stream for output to a log file.
-            time_obj = datetime.utcnow()
-            time_stamp = make_time_stamp_m(time_obj)
-            out_str += "{} (INFO)  : {}".format(time_stamp, output_stdout)
-
-            # Search stdout for exe error strings and pass them to the logger.
-            for error_key in error_keys:
-                error_pattern = err_dict[error_key]['pattern']
-                if error_pattern in output_stdout.decode():
-                    output_stdout = string.replace(output_stdout, "\n", "")
-                    err_dict[error_key]['count'] += 1
-
-                    if err_dict[error_key]['count_only']:
-                        if err_dict[error_key]['count'] < err_dict[error_key]['max_count']:
-                            LOG.warn(string.replace(output_stdout, "\n", ""))
-                        if err_dict[error_key]['count'] == err_dict[error_key]['max_count']:
-                            LOG.warn(string.replace(output_stdout, "\n", ""))
-                            LOG.warn(
-                                'Maximum number of "{}" messages reached,' +
-                                'further instances will be counted only'.format(error_key))
-                    else:
-                        LOG.warn(string.replace(output_stdout, "\n", ""))
-                    break
+            '''
+            Trawl through the stdout stream
+            '''
+            # 0.01 secs to let the shell output the result
+            output_stdout = nbsr_stdout.readline(0.01)
 
-        '''
-        Trawl through the stderr stream
-        '''
-        output_stderr = nbsr_stderr.readline()  # 0.1 secs to let the shell output the result
+            if output_stdout is not None:
 
-        if output_stderr is not None:
+                # Gather the stdout stream for output to a log file.
+                time_obj = datetime.utcnow()
+                time_stamp = make_time_stamp_m(time_obj)
+                out_str += "{} (INFO)  : {}".format(time_stamp, output_stdout)
 
-            # Gather the stderr stream for output to a log file.
-            time_obj = datetime.utcnow()
-            time_stamp = make_time_stamp_m(time_obj)
-            out_str += "{} (WARNING) : {}".format(time_stamp, output_stderr)
+                # Search stdout for exe error strings and pass them to the logger.
+                if error_re is not None:
+                    output_line = output_stdout.decode(errors='replace').rstrip('\n')
+                    if error_re.search(output_line) is not None:
+                        LOG.warn(output_line)
 
-        '''
-        Check to see if the stdout and stderr streams are ended
-        '''
-        if not nbsr_stdout.thread.is_alive():
-            LOG.debug("stdout thread has ended for {}".format(cmd.split(" ")[-1]))
-        if not nbsr_stderr.thread.is_alive():
-            LOG.debug("stderr thread has ended for {}".format(cmd.split(" ")[-1]))
+            '''
+            Trawl through the stderr stream
+            '''
+            output_stderr = nbsr_stderr.readline()  # 0.1 secs to let the shell output the result
 
-    # Flush the remaining content in the stdout and stderr streams
-    while True:
-        try:
-            # 0.01 secs to let the shell output the result
-            output_stdout = nbsr_stdout.readline(0.01)
-            # 0.1 secs to let the shell output the result
-            output_stderr = nbsr_stderr.readline()
-
-            if output_stdout is not None or output_stderr is not None:
-
-                if output_stdout is not None:
-                    # Gather the stdout stream for output to a log file.
-                    time_obj = datetime.utcnow()
-                    time_stamp = make_time_stamp_m(time_obj)
-                    out_str += "{} (INFO)  : {}".format(time_stamp, output_stdout)
-
-                if output_stderr is not None:
-                    # Gather the stderr stream for output to a log file.
-                    time_obj = datetime.utcnow()
-                    time_stamp = make_time_stamp_m(time_obj)
-                    out_str += "{} (WARNING)  : {}".format(time_stamp, output_stderr)
-            else:
-                break
+            if output_stderr is not None:
 
-        except IOError:
-            pass
+                # Gather the stderr stream for output to a log file.
+                time_obj = datetime.utcnow()
+                time_stamp = make_time_stamp_m(time_obj)
+                out_str += "{} (WARNING) : {}".format(time_stamp, output_stderr)
+
+            '''
+            Check to see if the stdout and stderr streams are ended
+            '''
+            if not nbsr_stdout.thread.is_alive():
+                LOG.debug("stdout thread has ended for {}".format(cmd.split(" ")[-1]))
+            if not nbsr_stderr.thread.is_alive():
+                LOG.debug("stderr thread has ended for {}".format(cmd.split(" ")[-1]))
+
+        # Flush the remaining content in the stdout and stderr streams
+        while True:
+            try:
+                # 0.01 secs to let the shell output the result
+                output_stdout = nbsr_stdout.readline(0.01)
+                # 0.1 secs to let the shell output the result
+                output_stderr = nbsr_stderr.readline()
+
+                if output_stdout is not None or output_stderr is not None:
+
+                    if output_stdout is not None:
+                        # Gather the stdout stream for output to a log file.
+                        time_obj = datetime.utcnow()
+                        time_stamp = make_time_stamp_m(time_obj)
+                        out_str += "{} (INFO)  : {}".format(time_stamp, output_stdout)
+
+                    if output_stderr is not None:
+                        # Gather the stderr stream for output to a log file.
+                        time_obj = datetime.utcnow()
+                        time_stamp = make_time_stamp_m(time_obj)
+                        out_str += "{} (WARNING)  : {}".format(time_stamp, output_stderr)
+                else:
+                    break
+
+            except IOError:
+                pass
+
+    except BaseException as err:
+        LOG.debug("Killing {}".format(cmd.split(" ")[-1]))
+        pids_to_kill = _child_pids(pop.pid) if kill_children else []
+        pids_to_kill.append(pop.pid)
+        for pid in pids_to_kill:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        pop.wait()
+        err.out_str = out_str
+        raise
 
     # Poll for the return code. A "None" value indicates that the process hasn’t terminated yet.
     # A negative value -N indicates that the child was terminated by signal N